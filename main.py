@@ -1,20 +1,41 @@
 import os
+import queue
 import re
+import signal
+import sqlite3
+import sys
 import time
 import argparse
+import atexit
+import calendar
+import functools
+import hashlib
+import mmap
+import multiprocessing
+import threading
+from array import array
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timezone
 from typing import Optional, Iterable, Tuple
 
 import praw
+import requests
 from prawcore import NotFound, Forbidden, Redirect
 from dotenv import load_dotenv
 from tqdm import tqdm
 import pathlib
 
+try:
+    import xxhash as _xxhash  # optional: faster content hash for the HU cache
+except ImportError:
+    _xxhash = None
+
 # ======= DEFAULT CONFIG =======
 DEFAULT_USERS = ["Levin"]  # just a test user so that the program doesn't crash
 DEFAULT_OUTDIR = "output"  # base output directory
 
+DEFAULT_WORKERS = 2  # users processed in parallel (Reddit requests still go out one at a time, see serialize_http)
+
 DEFAULT_USERFILE = "./users.txt"  # optional: default username list file
 VISITED_FILE = pathlib.Path("./visited_users.txt")     # file to store the usernames that have been visited
 TIMEOUTS_FILE = pathlib.Path("./timeouts_users.txt")   # file to store the usernames that have timed out so that we can download them again
@@ -22,52 +43,93 @@ TIMEOUTS_FILE = pathlib.Path("./timeouts_users.txt")   # file to store the usern
 # visited / new subs
 VISITED_SUBS_FILE = pathlib.Path("./visited_subs.txt")  # subredditek amiket skipelünk (post+comment)
 NEW_SUBS_FILE = pathlib.Path("./new_subs.txt")          # itt gyűjtjük az új subokat futás közben
+
+PRAW_PAGE_SIZE = 100  # items per listing request; --sleep pacing is charged once per page
+RATELIMIT_RESERVE = 10  # pause until the Reddit rate-limit window resets when fewer requests are left
+PUSHSHIFT_URL = "https://api.pushshift.io/reddit/search"
+PUSHSHIFT_PAGE_SIZE = 500  # ids per pushshift search request
+HU_CACHE_FILE = pathlib.Path("./hu_cache.sqlite")  # langdetect/hunspell scores of already seen texts
+HU_CACHE_FLUSH_EVERY = 500  # cached scores are inserted in batches of N
+HU_MIN_LEN = 15  # shorter texts are never HU (same cutoff as the detectors; no detector runs, nothing cached)
+HU_BATCH_SIZE = 256  # items scored per HU filter round-trip to the worker processes
+PBAR_BATCH = 64  # progress bar is updated every N items
+VISITED_COMPACT_MIN = 100_000  # visited_users.txt is held as a CompactSet from this many names on
+OUT_BUFFER_SIZE = 1 << 16  # *_posts.txt / *_chats.txt are written with one os.write per 64 KiB
 # ==============================
 
 
 # ---------- console logging ----------
+# log() only enqueues; a daemon thread batches whatever is queued into one stdout write + flush.
+# Keeps the print/flush syscalls off the download loops and lines from the user threads never interleave.
+_LOG_Q: "queue.Queue[Optional[str]]" = queue.Queue()
+_LOG_THREAD: Optional[threading.Thread] = None
+_LOG_START_LOCK = threading.Lock()
+
+
+def _drain_log() -> None:
+    while True:
+        buf = [_LOG_Q.get()]
+        while not _LOG_Q.empty():
+            buf.append(_LOG_Q.get_nowait())
+        stop = None in buf
+        lines = [m for m in buf if m is not None]
+        if lines:
+            sys.stdout.write("\n".join(lines) + "\n")
+            sys.stdout.flush()
+        if stop:
+            return
+
+
+def _no_log(msg: str) -> None:
+    pass
+
+
+def _stop_log_thread() -> None:
+    _LOG_Q.put(None)
+    _LOG_THREAD.join(timeout=5)
+
+
 def log(msg: str) -> None:
-    print(msg, flush=True)
+    global _LOG_THREAD
+    if _LOG_THREAD is None:
+        with _LOG_START_LOCK:
+            if _LOG_THREAD is None:
+                _LOG_THREAD = threading.Thread(target=_drain_log, name="log", daemon=True)
+                _LOG_THREAD.start()
+                atexit.register(_stop_log_thread)  # flush everything still queued at exit
+    _LOG_Q.put(msg)
 
 
 # ---------- visited / timeouts ----------
-def _norm_user(name: str) -> str:
-    name = (name or "").strip()
-    if name.lower().startswith("u/"):
-        name = name[2:]
-    return name.lower()
+_U_PREFIX = re.compile(r"^u/", re.I)
 
 
-def add_to_visited(username: str) -> None:
-    VISITED_FILE.touch(exist_ok=True)
-    key = _norm_user(username)
-    cur = set(x.strip() for x in VISITED_FILE.read_text(encoding="utf-8", errors="ignore").splitlines() if x.strip())
-    if key not in cur:
-        with VISITED_FILE.open("a", encoding="utf-8") as f:
-            f.write(key + "\n")
+def _norm_user_uncached(name: str) -> str:
+    # for one-off names (file lines at load time), so they don't push the hot names out of _norm_user's cache
+    return _U_PREFIX.sub("", (name or "").strip(), count=1).lower()
 
 
-def is_visited(username: str) -> bool:
-    VISITED_FILE.touch(exist_ok=True)
-    key = _norm_user(username)
-    return key in {x.strip() for x in VISITED_FILE.read_text(encoding="utf-8", errors="ignore").splitlines() if x.strip()}
+@functools.lru_cache(maxsize=8192)  # pure + called with the same names over and over
+def _norm_user(name: str) -> str:
+    return _norm_user_uncached(name)
 
 
-def add_to_timeouts(username: str) -> None:
-    TIMEOUTS_FILE.touch(exist_ok=True)
-    key = _norm_user(username)
-    cur = set(x.strip() for x in TIMEOUTS_FILE.read_text(encoding="utf-8", errors="ignore").splitlines() if x.strip())
-    if key not in cur:
-        with TIMEOUTS_FILE.open("a", encoding="utf-8") as f:
-            f.write(key + "\n")
+# ---------- subs helpers ----------
+# one subreddit per line: optional 'r/', surrounding whitespace and '#' comment lines ignored
+_SUB_LINE_RE = re.compile(rb"^[ \t]*(?:[rR]/)?([^\s#][^\r\n]*?)[ \t\r]*$", re.M)
 
 
-# ---------- subs helpers ----------
-def _norm_sub(name: str) -> str:
-    name = (name or "").strip()
-    if name.lower().startswith("r/"):
-        name = name[2:]
-    return name.lower()
+def _load_sub_set(path: pathlib.Path) -> set[str]:
+    """
+    Reads a subreddit list straight from an mmap of the file: the regex scans the mapped bytes,
+    only the matched names get lowercased/decoded (no str copy of the whole file, no per-line strip).
+    """
+    path.touch(exist_ok=True)
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return set()  # mmap can't map an empty file
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return {m.group(1).lower().decode("utf-8", errors="ignore") for m in _SUB_LINE_RE.finditer(mm)}
 
 
 def load_visited_subs() -> set[str]:
@@ -76,39 +138,119 @@ def load_visited_subs() -> set[str]:
       - egy subreddit soronként: pl. 'askreddit' vagy 'r/askreddit'
       - üres sorok és # kommentek ignorálva
     """
-    VISITED_SUBS_FILE.touch(exist_ok=True)
-    subs: set[str] = set()
-    for raw in VISITED_SUBS_FILE.read_text(encoding="utf-8", errors="ignore").splitlines():
-        line = raw.strip()
-        if not line or line.startswith("#"):
-            continue
-        subs.add(_norm_sub(line))
-    return subs
+    return _load_sub_set(VISITED_SUBS_FILE)
 
 
-def load_existing_new_subs() -> set[str]:
-    NEW_SUBS_FILE.touch(exist_ok=True)
-    return {
-        _norm_sub(x.strip())
-        for x in NEW_SUBS_FILE.read_text(encoding="utf-8", errors="ignore").splitlines()
-        if x.strip() and (not x.strip().startswith("#"))
-    }
-
+# ---------- append-only logs (visited users / timeouts / new subs) ----------
+class CompactSet:
+    """
+    Memory-light set of short strings for a huge visited_users.txt: all keys live in one sorted
+    b"\\n"-joined bytes blob + an array('I') of start offsets, lookups are binary searches.
+    add() goes to a small plain set first, merged into the blob (full re-sort) every MERGE_EVERY keys.
+    Trade-off: a lookup is a Python-level loop (~6 us at 100k keys vs ~0.1 us for a set, ~70x slower),
+    so it only pays off when memory matters -> AppendLog uses it above compact_above names only.
+    Readers don't lock: they rely on the (blob, offsets) tuple swap being atomic under the GIL.
+    """
 
-def append_new_sub(sub_key: str, new_subs_seen: set[str]) -> None:
+    __slots__ = ("_data", "_extra")
+    MERGE_EVERY = 1024
+
+    def __init__(self, keys: Iterable[str] = ()):
+        self._extra: set[str] = set()
+        self._data = self._build({k.encode("utf-8") for k in keys})
+
+    @staticmethod
+    def _build(keys) -> Tuple[bytes, array]:
+        keys = sorted(keys)
+        offs = array("I")
+        pos = 0
+        for k in keys:
+            offs.append(pos)
+            pos += len(k) + 1
+        return b"\n".join(keys) + b"\n" if keys else b"", offs
+
+    def __contains__(self, key: str) -> bool:
+        if key in self._extra:
+            return True
+        buf, offs = self._data
+        k = key.encode("utf-8")
+        lo, hi = 0, len(offs)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            o = offs[mid]
+            cur = buf[o:buf.index(b"\n", o)]
+            if cur == k:
+                return True
+            if cur < k:
+                lo = mid + 1
+            else:
+                hi = mid
+        return False
+
+    def __len__(self) -> int:
+        return len(self._data[1]) + len(self._extra)
+
+    def add(self, key: str) -> None:
+        """Not thread-safe on its own: the caller (AppendLog) serializes add()."""
+        if key in self:
+            return
+        self._extra.add(key)
+        if len(self._extra) >= self.MERGE_EVERY:
+            buf, _ = self._data
+            merged = buf.split(b"\n")[:-1] + [k.encode("utf-8") for k in self._extra]
+            self._data = self._build(merged)
+            self._extra = set()  # new object only after _data is swapped -> no key is ever missing
+
+
+class AppendLog:
     """
-    sub_key: normalizált (lower) subreddit név 'r/' nélkül
-    new_subs_seen: már kiírt new_sub-ok setje, hogy ne duplikáljunk
+    A set of names backed by an append-only file (visited_users.txt, timeouts_users.txt, new_subs.txt).
+    The file is read once into a set (a CompactSet above compact_above names); membership is checked
+    in memory and only new names are appended,
+    through one line-buffered handle kept open for the whole run (closed via atexit).
+    Safe to share between the user threads.
+    Names are normalized only when the file is loaded (norm per line, or a custom loader):
+    add() and `in` expect an already normalized key (_norm_user / bare lowercased sub name),
+    the caller must pass it that way.
     """
-    sub_key = _norm_sub(sub_key)
-    if not sub_key:
-        return
-    if sub_key in new_subs_seen:
-        return
-    NEW_SUBS_FILE.touch(exist_ok=True)
-    with NEW_SUBS_FILE.open("a", encoding="utf-8") as f:
-        f.write(sub_key + "\n")
-    new_subs_seen.add(sub_key)
+
+    def __init__(self, path: pathlib.Path, norm=_norm_user_uncached, loader=None,
+                 compact_above: Optional[int] = None):
+        self.path = path
+        path.touch(exist_ok=True)
+        if loader is not None:
+            seen = loader(path)
+        else:
+            # streamed line by line: no whole-file string + line list held at once
+            with open(path, "r", encoding="utf-8", errors="ignore") as f:
+                seen = {norm(x) for x in f if x.strip()}
+        # plain set unless the file is big enough for CompactSet's memory saving to matter
+        self._seen = CompactSet(seen) if compact_above is not None and len(seen) >= compact_above else seen
+        self._lock = threading.Lock()
+        self._fh = None  # opened on the first add()
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._seen
+
+    def __len__(self) -> int:
+        return len(self._seen)
+
+    def add(self, key: str) -> bool:
+        """key: already normalized. Returns True if it was new (and got appended to the file)."""
+        if not key:
+            return False
+        with self._lock:
+            if key in self._seen:
+                return False
+            self._seen.add(key)
+            if self._fh is None:
+                # O_APPEND: every write lands at the current end of file (atomic append, no read-back needed)
+                fd = os.open(str(self.path), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+                # line-buffered: every name is on disk as soon as it's written (a crash loses nothing)
+                self._fh = os.fdopen(fd, "a", encoding="utf-8", buffering=1)
+                atexit.register(self._fh.close)
+            self._fh.write(key + "\n")
+            return True
 
 
 # ---------- helpers ----------
@@ -117,6 +259,11 @@ def ensure_dir(p: str) -> None:
         os.makedirs(p, exist_ok=True)
 
 
+_UTC = timezone.utc
+# the finite decimal forms float() accepts ('1722575400', '1.7e9', '.5'); anything else is parsed as an ISO date
+_EPOCH_RE = re.compile(r"\s*[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?\s*")
+
+
 def to_epoch(dt: Optional[str]) -> Optional[int]:
     """
     dt can be:
@@ -127,28 +274,33 @@ def to_epoch(dt: Optional[str]) -> Optional[int]:
     """
     if dt is None:
         return None
-    try:
+    if _EPOCH_RE.fullmatch(dt):
         return int(float(dt))  # already epoch
+    # the two documented forms go through timegm (UTC struct_time -> epoch, no datetime/tzinfo objects)
+    try:
+        return calendar.timegm(time.strptime(dt, "%Y-%m-%dT%H:%M:%S" if "T" in dt else "%Y-%m-%d"))
     except ValueError:
         pass
+    # anything else fromisoformat accepts (e.g. no seconds, fractions) is still read as UTC
     if "T" in dt:
-        return int(datetime.fromisoformat(dt).replace(tzinfo=timezone.utc).timestamp())
-    return int(datetime.fromisoformat(dt + "T00:00:00").replace(tzinfo=timezone.utc).timestamp())
+        return int(datetime.fromisoformat(dt).replace(tzinfo=_UTC).timestamp())
+    return int(datetime.fromisoformat(dt + "T00:00:00").replace(tzinfo=_UTC).timestamp())
+
+
+_NL_INDENT_TABLE = str.maketrans({"\r": None})  # drops \r in one pass
 
 
 def _safe_text(s: Optional[str]) -> str:
     if not s:
         return ""
-    s = s.replace("\r", "")
-    lines = s.split("\n")
-    return ("\n      ").join(lines)
+    if "\r" not in s and "\n" not in s:
+        return s  # single-line text (the common case): no copy at all
+    return s.translate(_NL_INDENT_TABLE).replace("\n", "\n      ")
 
 
-def _fmt_utc(ts: int) -> str:
-    try:
-        return datetime.fromtimestamp(ts, tz=timezone.utc).isoformat()
-    except Exception:
-        return str(ts)
+# whole first token of a line, optional 'u/' prefix; '#' comment lines and blank lines never match
+_USER_LINE_RE = re.compile(r"^[ \t]*(?!#)(?:[uU]/)?(\S+)", re.M)
+_USERNAME_RE = re.compile(r"[A-Za-z0-9_\-]+")  # Reddit username charset
 
 
 def load_users_from_file(path: str) -> list[str]:
@@ -156,25 +308,22 @@ def load_users_from_file(path: str) -> list[str]:
     Read usernames from a text file, one per line.
     - Ignores empty lines and lines starting with '#'
     - Accepts optional leading 'u/' and removes it
-    - De-duplicates while preserving order (case-insensitive)
-    """
-    seen = set()
-    users: list[str] = []
-    with open(path, "r", encoding="utf-8") as f:
-        for raw in f:
-            line = raw.strip()
-            if not line or line.startswith("#"):
-                continue
-            if line.lower().startswith("u/"):
-                line = line[2:]
-            line = line.split()[0]
-            key = _norm_user(line)
-            if key and key not in seen:
-                seen.add(key)
-                users.append(line)
+    - A first token that is not a valid username is skipped with a warning (never truncated:
+      'foo.bar' must not turn into the different account 'foo')
+    - De-duplicates while preserving order (case-insensitive), names are returned lowercased
+    """
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        txt = f.read()
+    users: dict[str, None] = {}
+    for m in _USER_LINE_RE.finditer(txt):
+        name = m.group(1)
+        if _USERNAME_RE.fullmatch(name):
+            users[name.lower()] = None
+        else:
+            log(f"[warn] skipping invalid username in {path}: {name!r}")
     if not users:
         raise RuntimeError(f"No usernames found in file: {path}")
-    return users
+    return list(users)
 
 
 # ---------- auth ----------
@@ -196,7 +345,9 @@ def init_reddit() -> praw.Reddit:
                 client_id=cid,
                 client_secret=csec,
                 user_agent=ua,
-                ratelimit_seconds=5,
+                # only for RATELIMIT errors of write endpoints (submit/comment); read-only listings are
+                # paced by prawcore's X-Ratelimit-* handling + our RateLimiter (--sleep)
+                ratelimit_seconds=60,
             )
             r.read_only = True
             smoke_test(r)
@@ -208,18 +359,84 @@ def init_reddit() -> praw.Reddit:
     raise RuntimeError("Authentication error (check .env: REDDIT_CLIENT_ID, REDDIT_CLIENT_SECRET, REDDIT_USER_AGENT)")
 
 
+def serialize_http(reddit: praw.Reddit) -> None:
+    """
+    PRAW is not thread-safe: prawcore's RateLimiter.call() (delay() -> request -> update() from the
+    X-Ratelimit-* headers) has no lock, so parallel threads would all sleep to the same timestamp and
+    then fire together (-> 429s). One lock around that whole call: the user threads take turns on the
+    network and prawcore paces every request as if there was a single thread.
+    (prawcore internals, so best effort)
+    """
+    lock = threading.Lock()
+    cores = [getattr(reddit, n, None) for n in ("_core", "_read_only_core", "_authorized_core")]
+    limiters = {id(lim): lim for lim in (getattr(c, "_rate_limiter", None) for c in cores if c is not None)
+                if lim is not None and hasattr(lim, "call")}
+    if not limiters:
+        log("[warn] could not serialize PRAW requests (prawcore internals changed), use --workers 1")
+        return
+
+    for limiter in limiters.values():
+        orig_call = limiter.call
+
+        def call(*args, _orig=orig_call, **kwargs):
+            with lock:
+                return _orig(*args, **kwargs)
+
+        limiter.call = call
+
+
+# ---------- pacing ----------
+class RateLimiter:
+    """
+    Keeps at least min_gap seconds between two wait() calls, shared by all user threads.
+    Only charged before an actual listing request (once per page), so skipped items cost nothing;
+    if the request itself took longer than min_gap, wait() does not sleep at all.
+
+    With a reddit instance it also reads PRAW's view of the quota (reddit.auth.limits, filled from the
+    X-Ratelimit-* headers of the last response): once fewer than reserve requests are left, the
+    threads hold off until the window resets instead of running into 429s.
+    """
+
+    def __init__(self, min_gap: float, reddit: Optional[praw.Reddit] = None, reserve: int = RATELIMIT_RESERVE):
+        self.min_gap = max(0.0, min_gap)
+        self._reddit = reddit
+        self._reserve = reserve
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def _quota_wait(self) -> float:
+        """Seconds until the Reddit rate-limit window resets, 0 if enough requests are left."""
+        try:
+            limits = self._reddit.auth.limits
+        except AttributeError:
+            return 0.0
+        remaining = limits.get("remaining")
+        reset_ts = limits.get("reset_timestamp")
+        if remaining is None or reset_ts is None or remaining >= self._reserve:
+            return 0.0
+        return max(0.0, reset_ts - time.time())  # reset_timestamp is wall-clock epoch
+
+    def wait(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            if self._reddit is not None:
+                slot = max(slot, now + self._quota_wait())
+            self._next = slot + self.min_gap
+        if slot > now:
+            time.sleep(slot - now)
+
+
 # ---------- resolve user ----------
-def resolve_user(reddit: praw.Reddit, username: str):
+@functools.lru_cache(maxsize=4096)
+def resolve_user(reddit: praw.Reddit, name: str):
     """
     Validate user exists & accessible.
+    name: already normalized (_norm_user).
     Returns a PRAW Redditor object or None.
     """
-    name = (username or "").strip()
-    if not name:
-        return None
-    if name.lower().startswith("u/"):
-        name = name[2:]
-
+    # memoized per (reddit, name): the u.id probe is one HTTP round-trip,
+    # negative results (None) are cached as well
     u = reddit.redditor(name)
     try:
         _ = u.id  # Force fetch
@@ -237,9 +454,13 @@ def resolve_user(reddit: praw.Reddit, username: str):
 
 # ---------- iterators (descending by new) ----------
 def iter_user_posts(user, before: Optional[int], after: Optional[int], hard_limit: Optional[int]) -> Iterable:
+    # item attributes are read from __dict__ (already filled by the listing response):
+    # getattr() on a missing field would make PRAW lazily re-fetch the object
+    # without a 'before' bound every yielded item counts -> let PRAW stop paging at hard_limit itself
+    praw_limit = hard_limit if (hard_limit and before is None) else None
     count = 0
-    for s in user.submissions.new(limit=None):
-        cu = int(getattr(s, "created_utc", 0))
+    for s in user.submissions.new(limit=praw_limit):
+        cu = int(s.__dict__.get("created_utc", 0))
         if before is not None and cu > before:
             continue
         if after is not None and cu < after:
@@ -251,9 +472,11 @@ def iter_user_posts(user, before: Optional[int], after: Optional[int], hard_limi
 
 
 def iter_user_comments(user, before: Optional[int], after: Optional[int], hard_limit: Optional[int]) -> Iterable:
+    # without a 'before' bound every yielded item counts -> let PRAW stop paging at hard_limit itself
+    praw_limit = hard_limit if (hard_limit and before is None) else None
     count = 0
-    for c in user.comments.new(limit=None):
-        cu = int(getattr(c, "created_utc", 0))
+    for c in user.comments.new(limit=praw_limit):
+        cu = int(c.__dict__.get("created_utc", 0))
         if before is not None and cu > before:
             continue
         if after is not None and cu < after:
@@ -264,61 +487,173 @@ def iter_user_comments(user, before: Optional[int], after: Optional[int], hard_l
             break
 
 
+# ---------- pushshift (time-bounded id lookup) ----------
+def fetch_ids_pushshift(username: str, kind: str, after: Optional[int], before: Optional[int],
+                        hard_limit: Optional[int],
+                        rate_limiter: Optional[RateLimiter] = None) -> Optional[list[str]]:
+    """
+    kind: 'submission' or 'comment'
+    Returns the item ids of u/username inside [after, before] (newest first),
+    or None if Pushshift is unreachable / returns garbage -> caller falls back to PRAW listings.
+    Every search request is paced by the shared rate_limiter, like the listing pages.
+    """
+    params = {
+        "author": username,
+        "size": PUSHSHIFT_PAGE_SIZE,
+        "sort": "desc",
+        "sort_type": "created_utc",
+        "fields": "id,created_utc",
+    }
+    # pushshift bounds are exclusive, ours are inclusive
+    if after is not None:
+        params["after"] = after - 1
+    if before is not None:
+        params["before"] = before + 1
+
+    ids: list[str] = []
+    seen: set[str] = set()
+    try:
+        while True:
+            if rate_limiter is not None:
+                rate_limiter.wait()
+            resp = requests.get(f"{PUSHSHIFT_URL}/{kind}", params=params, timeout=30)
+            resp.raise_for_status()
+            data = resp.json().get("data") or []
+            n_before = len(ids)
+            for d in data:
+                i = str(d["id"])
+                if i not in seen:
+                    seen.add(i)
+                    ids.append(i)
+            if hard_limit and len(ids) >= hard_limit:
+                return ids[:hard_limit]
+            if len(data) < PUSHSHIFT_PAGE_SIZE or len(ids) == n_before:
+                return ids  # last page (or a full page inside one second: no way to page further)
+            # 'before' is exclusive: +1 asks for the boundary second again, so items of that second
+            # that did not fit on this page are not lost (the repeated ones are dropped via seen)
+            params["before"] = min(int(d["created_utc"]) for d in data) + 1
+    except Exception as e:
+        log(f"[warn] pushshift lookup failed for u/{username} ({kind}s), using PRAW listing: {e!r}")
+        return None
+
+
+def iter_user_items_pushshift(reddit: praw.Reddit, username: str, kind: str, before: Optional[int],
+                              after: Optional[int], hard_limit: Optional[int],
+                              rate_limiter: Optional[RateLimiter] = None) -> Optional[Iterable]:
+    """
+    Same items as iter_user_posts / iter_user_comments, but only the requested time window is fetched:
+    ids come from Pushshift, then they are hydrated via reddit.info() (100 per request).
+    Returns None if Pushshift cannot be used.
+    """
+    ids = fetch_ids_pushshift(username, kind, after, before, hard_limit, rate_limiter)
+    if ids is None:
+        return None
+    if not ids:
+        return iter(())
+    prefix = "t3_" if kind == "submission" else "t1_"
+    return reddit.info(fullnames=[prefix + i for i in ids])
+
+
 # ---------- writing ----------
-def write_post_block(f, s) -> None:
-    title = getattr(s, "title", "") or ""
-    subreddit = str(getattr(s, "subreddit", "")) or ""
-    selftext = _safe_text(getattr(s, "selftext", None))
+class _FdWriter:
+    """
+    Minimal binary writer on a raw fd: blocks are collected in a bytearray and handed to
+    os.write() OUT_BUFFER_SIZE at a time (no BufferedWriter layer in between).
+    Only used from one thread (each output file belongs to one drain loop).
+    """
 
-    f.write("Post:\n")
-    f.write(f"  subreddit: r/{subreddit}\n")
-    f.write(f"  title: {title}\n")
-    if selftext:
-        f.write("  body:\n")
-        f.write(f"    {selftext}\n")
-    f.write("\n")
+    __slots__ = ("_fd", "_buf")
 
+    def __init__(self, path: pathlib.Path):
+        self._fd = os.open(str(path), os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        self._buf = bytearray()
 
-def write_comment_block(f, c) -> None:
-    subreddit = str(getattr(c, "subreddit", "")) or ""
-    body = _safe_text(getattr(c, "body", None))
+    def write(self, data: bytes) -> None:
+        self._buf += data
+        if len(self._buf) >= OUT_BUFFER_SIZE:
+            self.flush()
 
-    f.write("Comment:\n")
-    f.write(f"  subreddit: r/{subreddit}\n")
-    if body:
-        f.write("  body:\n")
-        f.write(f"    {body}\n")
-    f.write("\n")
+    def flush(self) -> None:
+        with memoryview(self._buf) as view:
+            done = 0
+            while done < len(view):
+                done += os.write(self._fd, view[done:])  # os.write may write less than asked
+        self._buf.clear()
+
+    def close(self) -> None:
+        if self._fd < 0:
+            return
+        try:
+            self.flush()
+        finally:
+            os.close(self._fd)
+            self._fd = -1
+
+
+def write_post_block(f, d: dict) -> None:
+    """d: the submission's field dict (s.__dict__)"""
+    title = d.get("title", "") or ""
+    subreddit = str(d.get("subreddit", "")) or ""
+    selftext = _safe_text(d.get("selftext"))
+
+    # whole block as one string -> one write() of utf-8 bytes per item
+    body_block = f"  body:\n    {selftext}\n" if selftext else ""
+    f.write(f"Post:\n  subreddit: r/{subreddit}\n  title: {title}\n{body_block}\n".encode("utf-8"))
+
+
+def write_comment_block(f, d: dict) -> None:
+    """d: the comment's field dict (c.__dict__)"""
+    subreddit = str(d.get("subreddit", "")) or ""
+    body = _safe_text(d.get("body"))
+
+    body_block = f"  body:\n    {body}\n" if body else ""
+    f.write(f"Comment:\n  subreddit: r/{subreddit}\n{body_block}\n".encode("utf-8"))
 
 
 # ---------- HU filter (langdetect + phunspell) ----------
-_WORD_RE = re.compile(r"[A-Za-zÁÉÍÓÖŐÚÜŰáéíóöőúüű]+")
+# applied to the lowercased text: tokenizes + drops 1-letter words in a single regex pass
+_WORD_RE = re.compile(r"[a-záéíóöőúüű]{2,}")
+_HU_CHARS_DELETE = str.maketrans("", "", "áéíóöőúüűÁÉÍÓÖŐÚÜŰ")  # len(translate) == len -> no HU letters
 
 
-def init_langdetect():
+def init_langdetect(verbose: bool = True):
     """
     Returns (detect_langs_func, ok_bool).
+    verbose=False: no log lines (HU filter worker processes, the parent already reported).
     """
+    say = log if verbose else _no_log
     try:
         from langdetect import detect_langs, DetectorFactory
         DetectorFactory.seed = 0
         return detect_langs, True
     except Exception as e:
-        log(f"[warn] langdetect not available: {e!r}")
+        say(f"[warn] langdetect not available: {e!r}")
         return None, False
 
 
-def init_hunspell_hu():
+class _CachedSpeller:
+    """
+    Wraps a phunspell object so spell() results are memoized per (lowercased) word.
+    Word frequencies are very skewed, so most lookups never reach hunspell.
+    """
+
+    def __init__(self, hunspell_obj, maxsize: int = 200_000):
+        self.spell = functools.lru_cache(maxsize=maxsize)(hunspell_obj.spell)
+
+
+def init_hunspell_hu(verbose: bool = True):
     """
     Returns (hunspell_obj, ok_bool).
     Needs Hungarian dictionary (.aff/.dic). We try:
       - env: HUNSPELL_AFF + HUNSPELL_DIC
       - common linux paths
+    verbose=False: no log lines (see init_langdetect)
     """
+    say = log if verbose else _no_log
     try:
         from phunspell import HunSpell
     except Exception as e:
-        log(f"[warn] phunspell not available: {e!r}")
+        say(f"[warn] phunspell not available: {e!r}")
         return None, False
 
     env_aff = os.getenv("HUNSPELL_AFF", "").strip()
@@ -338,12 +673,12 @@ def init_hunspell_hu():
         try:
             if os.path.exists(aff) and os.path.exists(dic):
                 hs = HunSpell(dic, aff)  # phunspell: HunSpell(dic_path, aff_path)
-                log(f"[lang] phunspell OK: {dic} + {aff}")
-                return hs, True
+                say(f"[lang] phunspell OK: {dic} + {aff}")
+                return _CachedSpeller(hs), True
         except Exception as e:
-            log(f"[warn] phunspell init failed for {dic} / {aff}: {e!r}")
+            say(f"[warn] phunspell init failed for {dic} / {aff}: {e!r}")
 
-    log("[warn] phunspell available, but Hungarian dictionary not found. "
+    say("[warn] phunspell available, but Hungarian dictionary not found. "
         "Set HUNSPELL_AFF and HUNSPELL_DIC env vars, or install hu_HU hunspell dict.")
     return None, False
 
@@ -354,6 +689,10 @@ def langdetect_hu_score(text: str, detect_langs_func) -> Optional[float]:
     t = (text or "").strip()
     if len(t) < 15:
         return 0.0
+    # cheap prefilter: a longer text without a single Hungarian accented letter is not HU for langdetect
+    # (hunspell still gets a chance on accent-less Hungarian, see is_hungarian)
+    if len(t) > 50 and len(t.translate(_HU_CHARS_DELETE)) == len(t):
+        return 0.0
     try:
         langs = detect_langs_func(t)
         # langs: [hu:0.87, en:0.13] ...
@@ -369,20 +708,20 @@ def hunspell_hu_score(text: str, hunspell_obj) -> Optional[float]:
     if hunspell_obj is None:
         return None
     t = (text or "").strip()
-    if not t:
+    if len(t) < 15:
         return 0.0
 
-    words = _WORD_RE.findall(t)
-    words = [w.lower() for w in words if len(w) >= 2]
+    words = _WORD_RE.findall(t.lower())
     if len(words) < 5:
         return 0.0
 
+    spell = hunspell_obj.spell
     ok = 0
     total = 0
     for w in words[:400]:  # safety cap
         total += 1
         try:
-            if hunspell_obj.spell(w):
+            if spell(w):
                 ok += 1
         except Exception:
             # if spell fails, ignore that word from ratio
@@ -393,176 +732,432 @@ def hunspell_hu_score(text: str, hunspell_obj) -> Optional[float]:
     return ok / total
 
 
+_HU_TOO_SHORT = (False, 0.0, 0.0)  # is_hungarian() result for texts under HU_MIN_LEN
+
+
 def is_hungarian(text: str, threshold: float, detect_langs_func, hunspell_obj) -> Tuple[bool, float, float]:
     """
     Returns: (is_hu, langdetect_score, hunspell_score)
-    If a detector is unavailable -> score = -1.0
+    If a detector is unavailable (or was not needed) -> score = -1.0
     Rule: keep if (langdetect_score >= threshold) OR (hunspell_score >= threshold)
+    langdetect runs first; the (much slower) hunspell check only runs if langdetect did not pass.
     """
-    ld = langdetect_hu_score(text, detect_langs_func)
-    hs = hunspell_hu_score(text, hunspell_obj)
+    if len(text or "") < HU_MIN_LEN:
+        return _HU_TOO_SHORT
 
+    ld = langdetect_hu_score(text, detect_langs_func)
     ld_score = float(ld) if ld is not None else -1.0
-    hs_score = float(hs) if hs is not None else -1.0
-
-    keep = False
     if ld is not None and ld >= threshold:
-        keep = True
-    if hs is not None and hs >= threshold:
-        keep = True
+        return True, ld_score, -1.0
+
+    hs = hunspell_hu_score(text, hunspell_obj)
+    hs_score = float(hs) if hs is not None else -1.0
 
+    keep = hs is not None and hs >= threshold
     return keep, ld_score, hs_score
 
 
+# HU filter on worker processes: langdetect + hunspell are pure-Python / GIL-bound,
+# so batches of texts are scored on a multiprocessing.Pool (one detector set per worker)
+_HU_WORKER_STATE: Optional[Tuple[float, object, object]] = None
+
+
+def _hu_worker_init(threshold: float) -> None:
+    global _HU_WORKER_STATE
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl+C is handled by the parent, which closes the pool
+    detect_langs_func, _ = init_langdetect(verbose=False)
+    hunspell_obj, _ = init_hunspell_hu(verbose=False)
+    _HU_WORKER_STATE = (threshold, detect_langs_func, hunspell_obj)
+
+
+def _is_hu_worker(text: str) -> Tuple[bool, float, float]:
+    threshold, detect_langs_func, hunspell_obj = _HU_WORKER_STATE
+    return is_hungarian(text, threshold, detect_langs_func, hunspell_obj)
+
+
+def init_hu_pool(threshold: float, processes: Optional[int] = None):
+    """
+    Returns a multiprocessing.Pool for the HU filter, or None if there is only one core.
+    The detectors are not picklable, so every worker builds its own in the initializer.
+    Workers are spawned, not forked: the parent already runs threads (log writer) and
+    forking a multi-threaded process is unsafe (Python 3.12+ warns about it).
+    """
+    processes = processes or os.cpu_count() or 1
+    if processes < 2:
+        return None
+    log(f"[lang] HU filter runs on {processes} worker processes")
+    ctx = multiprocessing.get_context("spawn")
+    return ctx.Pool(processes, initializer=_hu_worker_init, initargs=(threshold,))
+
+
+# ---------- HU decision cache (sqlite, keyed by content hash) ----------
+def _text_hash(text: str) -> int:
+    """64-bit content hash as a signed int (sqlite INTEGER PRIMARY KEY range)."""
+    data = text.encode("utf-8", errors="ignore")
+    if _xxhash is not None:
+        h = _xxhash.xxh64_intdigest(data)
+        return h - (1 << 64) if h >= (1 << 63) else h
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "big", signed=True)
+
+
+class HuCache:
+    """
+    Persistent (langdetect_score, hunspell_score) per text, so re-runs over the same users
+    (e.g. --reset-visited) skip both detectors for unchanged items.
+    Scores are stored, not decisions -> the cache stays valid for any --filterhu threshold.
+    """
+
+    def __init__(self, path: pathlib.Path, hunspell_ok: bool):
+        self._hunspell_ok = hunspell_ok
+        self._lock = threading.Lock()  # one connection shared by the user threads
+        self._pending: dict[int, Tuple[float, float]] = {}
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS hu (hash INTEGER PRIMARY KEY, ld REAL, hs REAL)")
+        self._conn.commit()
+
+    def lookup(self, text: str, threshold: float) -> Optional[Tuple[bool, float, float]]:
+        """
+        Returns the is_hungarian() result for text, or None if it has to be (re)computed.
+        Only for texts of HU_MIN_LEN+ chars (shorter ones are rejected up front and never stored);
+        for those is_hungarian keeps exactly when ld >= threshold or hs >= threshold (missing = -1).
+        """
+        h = _text_hash(text)
+        with self._lock:
+            row = self._pending.get(h)
+            if row is None:
+                row = self._conn.execute("SELECT ld, hs FROM hu WHERE hash=?", (h,)).fetchone()
+        if row is None:
+            return None
+        ld, hs = row
+        if ld >= threshold or hs >= threshold:
+            return True, ld, hs
+        if hs < 0 and self._hunspell_ok:
+            return None  # hunspell was skipped (langdetect passed at another threshold) -> unknown
+        return False, ld, hs
+
+    def store(self, text: str, ld: float, hs: float) -> None:
+        with self._lock:
+            self._pending[_text_hash(text)] = (ld, hs)
+            if len(self._pending) >= HU_CACHE_FLUSH_EVERY:
+                self._flush_locked()
+
+    def _flush_locked(self) -> None:
+        if self._pending:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO hu (hash, ld, hs) VALUES (?, ?, ?)",
+                [(h, ld, hs) for h, (ld, hs) in self._pending.items()])
+            self._conn.commit()
+            self._pending.clear()
+
+    def close(self) -> None:
+        with self._lock:
+            self._flush_locked()
+            self._conn.close()
+
+
+def _score_batch(batch: list, threshold: float, detect_langs_func, hunspell_obj, hu_pool, hu_cache) -> Iterable:
+    # short texts: decided without hashing / sqlite / worker round-trip
+    results = [_HU_TOO_SHORT if len(text) < HU_MIN_LEN else
+               hu_cache.lookup(text, threshold) if hu_cache is not None else None
+               for _, _, text in batch]
+    misses = [i for i, res in enumerate(results) if res is None]
+    if misses:
+        texts = [batch[i][2] for i in misses]
+        if hu_pool is not None:
+            scored = hu_pool.map(_is_hu_worker, texts)
+        else:
+            scored = [is_hungarian(t, threshold, detect_langs_func, hunspell_obj) for t in texts]
+        for i, res in zip(misses, scored):
+            results[i] = res
+            if hu_cache is not None:
+                hu_cache.store(batch[i][2], res[1], res[2])
+    for (item, sub_key, _), res in zip(batch, results):
+        yield item, sub_key, res
+
+
+def hu_decisions(candidates: Iterable, threshold: Optional[float], detect_langs_func, hunspell_obj,
+                 hu_pool=None, hu_cache: Optional[HuCache] = None) -> Iterable:
+    """
+    candidates: (item, sub_key, text) tuples
+    Yields (item, sub_key, (is_hu, langdetect_score, hunspell_score)) in the same order.
+    No threshold -> everything is kept. With hu_pool the texts are scored HU_BATCH_SIZE at a time.
+    Texts already in hu_cache are not scored again.
+    """
+    if threshold is None:
+        for item, sub_key, _ in candidates:
+            yield item, sub_key, (True, -1.0, -1.0)
+        return
+
+    batch_size = HU_BATCH_SIZE if hu_pool is not None else 1
+    batch = []
+    for cand in candidates:
+        batch.append(cand)
+        if len(batch) >= batch_size:
+            yield from _score_batch(batch, threshold, detect_langs_func, hunspell_obj, hu_pool, hu_cache)
+            batch = []
+    if batch:
+        yield from _score_batch(batch, threshold, detect_langs_func, hunspell_obj, hu_pool, hu_cache)
+
+
 # ---------- main download ----------
+class _Stopped(Exception):
+    """Raised inside a download loop when the run is being stopped (Ctrl+C)."""
+
+
+class _BatchedProgress:
+    """
+    tqdm wrapper: items are counted locally and handed to tqdm PBAR_BATCH at a time
+    (tqdm.update takes a lock + formats its state on every call).
+    """
+
+    def __init__(self, pbar):
+        self._pbar = pbar
+        self._pending = 0
+
+    def tick(self) -> None:
+        self._pending += 1
+        if self._pending >= PBAR_BATCH:
+            self._pbar.update(self._pending)
+            self._pending = 0
+
+    def close(self) -> None:
+        if self._pending:
+            self._pbar.update(self._pending)
+            self._pending = 0
+        self._pbar.close()
+
+
 def download_user_activity(
     reddit: praw.Reddit,
-    username: str,
-    out_dir: str,
+    uname_key: str,
+    out_dir: pathlib.Path,
     after: Optional[int],
     before: Optional[int],
     limit_posts: Optional[int],
     limit_comments: Optional[int],
-    sleep_s: float = 0.5,
+    rate_limiter: Optional[RateLimiter] = None,
     include_posts: bool = True,
     include_comments: bool = True,
-    visited_subs: Optional[set[str]] = None,
-    new_subs_seen: Optional[set[str]] = None,
+    visited_subs: Optional[frozenset[str]] = None,
+    new_subs_log: Optional[AppendLog] = None,
     hu_threshold: Optional[float] = None,
     detect_langs_func=None,
     hunspell_obj=None,
+    hu_pool=None,
+    hu_cache: Optional[HuCache] = None,
+    use_pushshift: bool = False,
+    visited_log: Optional[AppendLog] = None,
+    stop: Optional[threading.Event] = None,
 ) -> None:
-    uname_key = _norm_user(username)
+    # uname_key: already normalized (_norm_user) by main(), it is used as-is from here on
     log(f"[start] Processing u/{uname_key}")
 
-    user = resolve_user(reddit, username)
+    if not include_posts and not include_comments:
+        log(f"[done]  Nothing to download for u/{uname_key} (--no-posts + --no-comments)")
+        if visited_log is not None:
+            visited_log.add(uname_key)
+        return
+
+    user = resolve_user(reddit, uname_key) if uname_key else None
     if user is None:
         log(f"[done]  Skipped u/{uname_key}")
+        if visited_log is not None:
+            visited_log.add(uname_key)
         return
 
     # FIX: ne használj "or set()" mintát, mert az üres set-et is lecseréli egy újra
     if visited_subs is None:
-        visited_subs = set()
-    if new_subs_seen is None:
-        new_subs_seen = set()
-
-    # csak egyszer írjuk ki userenként ugyanazt az üzenetet
-    logged_visited_subs: set[str] = set()
-    logged_filter_skips: int = 0  # ne spameljen végtelenül
-
-    ensure_dir(out_dir)
-    posts_path = os.path.join(out_dir, f"{uname_key}_posts.txt")
-    chats_path = os.path.join(out_dir, f"{uname_key}_chats.txt")
-
-    posts_saved = 0
-    cmts_saved = 0
-
-    posts_file = open(posts_path, "w", encoding="utf-8") if include_posts else None
-    cmts_file = open(chats_path, "w", encoding="utf-8") if include_comments else None
-
-    try:
-        if posts_file:
-            posts_file.write(f"=== u/{uname_key} POSTS ===\n\n")
-        if cmts_file:
-            cmts_file.write(f"=== u/{uname_key} COMMENTS ===\n\n")
-
-        if include_posts and posts_file:
-            log(f"[dl]   Downloading u/{uname_key} posts ...")
-            pbar = tqdm(desc=f"Posts u/{uname_key}", unit="post")
-            for s in iter_user_posts(user, before=before, after=after, hard_limit=limit_posts):
-                sub = str(getattr(s, "subreddit", "")) or ""
-                sub_key = _norm_sub(sub)
+        visited_subs = frozenset()
+
+    # per-sub döntések cache-elve (egy user sokszor ír ugyanabba a subba):
+    #  - sub_allowed: sub_key -> nincs a visited_subs-ban (első látáskor számoljuk + ekkor logolunk egyszer)
+    #  - subs_recorded: ezekre már lefutott a new_subs_log.add()
+    sub_allowed: dict[str, bool] = {}
+    subs_recorded: set[str] = set()
+
+    # out_dir is created once in main()
+    posts_path = out_dir / f"{uname_key}_posts.txt"
+    chats_path = out_dir / f"{uname_key}_chats.txt"
+
+    # raw fd + bytearray buffer: blocks are encoded once and flushed to disk in big chunks, not per item
+    # opened (+ header written) on the first saved item -> no empty header-only files
+    posts_file = None
+    cmts_file = None
+
+    def _posts_out():
+        nonlocal posts_file
+        if posts_file is None:
+            posts_file = _FdWriter(posts_path)
+            posts_file.write(f"=== u/{uname_key} POSTS ===\n\n".encode("utf-8"))
+        return posts_file
+
+    def _cmts_out():
+        nonlocal cmts_file
+        if cmts_file is None:
+            cmts_file = _FdWriter(chats_path)
+            cmts_file.write(f"=== u/{uname_key} COMMENTS ===\n\n".encode("utf-8"))
+        return cmts_file
+
+    def drain_posts() -> int:
+        posts_saved = 0
+        logged_skips = 0  # ne spameljen végtelenül
+        log(f"[dl]   Downloading u/{uname_key} posts ...")
+        pbar = _BatchedProgress(tqdm(desc=f"Posts u/{uname_key}", unit="post",
+                                     mininterval=0.5, miniters=PBAR_BATCH, smoothing=0.1))
+
+        def post_candidates():
+            fetched = 0
+            source = None
+            if use_pushshift and (after is not None or before is not None):
+                source = iter_user_items_pushshift(reddit, uname_key, "submission", before, after, limit_posts,
+                                                       rate_limiter)
+            if source is None:
+                source = iter_user_posts(user, before=before, after=after, hard_limit=limit_posts)
+            for s in source:
+                if stop is not None and stop.is_set():
+                    raise _Stopped("run interrupted")
+                # throttle per listing page (PRAW fetches PRAW_PAGE_SIZE items per request), not per item
+                fetched += 1
+                if rate_limiter is not None and fetched % PRAW_PAGE_SIZE == 0:
+                    rate_limiter.wait()
+
+                d = s.__dict__  # raw fields of the listing item, passed on instead of the PRAW object
+                # PRAW gives the bare display name (no 'r/', no whitespace) -> lower() is enough;
+                # interned: a user posts to few subs, so the cache/set keys share one str object per sub
+                sub_key = sys.intern(str(d.get("subreddit", "")).lower())
 
                 # visited subs -> skip
-                if sub_key in visited_subs:
-                    if sub_key not in logged_visited_subs:
+                allowed = sub_allowed.get(sub_key)
+                if allowed is None:
+                    allowed = sub_allowed[sub_key] = sub_key not in visited_subs
+                    if not allowed:
                         log(f"[skip] r/{sub_key} in visited_subs.txt, skipped (posts)")
-                        logged_visited_subs.add(sub_key)
-                    pbar.update(1)
-                    time.sleep(sleep_s)
+                if not allowed:
+                    pbar.tick()
                     continue
 
-                # HU filter
+                text = ""
                 if hu_threshold is not None:
-                    title = getattr(s, "title", "") or ""
-                    selftext = getattr(s, "selftext", "") or ""
+                    title = d.get("title", "") or ""
+                    selftext = d.get("selftext", "") or ""
                     text = (title + "\n" + selftext).strip()
+                yield d, sub_key, text
+
+        for d, sub_key, (keep, ld_score, hs_score) in hu_decisions(
+                post_candidates(), hu_threshold, detect_langs_func, hunspell_obj, hu_pool, hu_cache):
+            # HU filter
+            if not keep:
+                if logged_skips < 5:
+                    log(f"[skip] r/{sub_key} not HU enough (posts) ld={ld_score:.3f} hs={hs_score:.3f}")
+                    logged_skips += 1
+                pbar.tick()
+                continue
 
-                    keep, ld_score, hs_score = is_hungarian(text, hu_threshold, detect_langs_func, hunspell_obj)
-                    if not keep:
-                        if logged_filter_skips < 5:
-                            log(f"[skip] r/{sub_key} not HU enough (posts) ld={ld_score:.3f} hs={hs_score:.3f}")
-                            logged_filter_skips += 1
-                        pbar.update(1)
-                        time.sleep(sleep_s)
-                        continue
-
-                # FIX: new_subs.txt-be csak akkor, ha:
-                #  - ezt az elemet tényleg megtartjuk (eddig eljutottunk)
-                #  - és még nincs benne a new_subs_seen (ami a file tartalmát is tükrözi)
-                if sub_key and (sub_key not in new_subs_seen):
+            # FIX: new_subs.txt-be csak akkor, ha:
+            #  - ezt az elemet tényleg megtartjuk (eddig eljutottunk)
+            #  - és még nincs benne a new_subs_log-ban (ami a file tartalmát is tükrözi)
+            if sub_key not in subs_recorded:
+                subs_recorded.add(sub_key)
+                if new_subs_log is not None and new_subs_log.add(sub_key):
                     log(f"[new]  r/{sub_key}")
-                    append_new_sub(sub_key, new_subs_seen)
-
-                write_post_block(posts_file, s)
-                posts_saved += 1
-                pbar.update(1)
-                time.sleep(sleep_s)
-
-            pbar.close()
-            log(f"[dl]   Finished u/{uname_key} posts. Saved: {posts_saved} -> {posts_path}")
 
-        if include_comments and cmts_file:
-            log(f"[dl]   Downloading u/{uname_key} comments ...")
-            pbar = tqdm(desc=f"Comments u/{uname_key}", unit="comment")
-            for c in iter_user_comments(user, before=before, after=after, hard_limit=limit_comments):
-                sub = str(getattr(c, "subreddit", "")) or ""
-                sub_key = _norm_sub(sub)
+            write_post_block(posts_file or _posts_out(), d)
+            posts_saved += 1
+            pbar.tick()
+
+        pbar.close()
+        log(f"[dl]   Finished u/{uname_key} posts. Saved: {posts_saved} -> {posts_path if posts_saved else 'no file'}")
+        return posts_saved
+
+    def drain_comments() -> int:
+        cmts_saved = 0
+        logged_skips = 0  # ne spameljen végtelenül
+        log(f"[dl]   Downloading u/{uname_key} comments ...")
+        pbar = _BatchedProgress(tqdm(desc=f"Comments u/{uname_key}", unit="comment",
+                                     mininterval=0.5, miniters=PBAR_BATCH, smoothing=0.1))
+
+        def comment_candidates():
+            fetched = 0
+            source = None
+            if use_pushshift and (after is not None or before is not None):
+                source = iter_user_items_pushshift(reddit, uname_key, "comment", before, after, limit_comments,
+                                                       rate_limiter)
+            if source is None:
+                source = iter_user_comments(user, before=before, after=after, hard_limit=limit_comments)
+            for c in source:
+                if stop is not None and stop.is_set():
+                    raise _Stopped("run interrupted")
+                # throttle per listing page (PRAW fetches PRAW_PAGE_SIZE items per request), not per item
+                fetched += 1
+                if rate_limiter is not None and fetched % PRAW_PAGE_SIZE == 0:
+                    rate_limiter.wait()
+
+                d = c.__dict__  # raw fields of the listing item, passed on instead of the PRAW object
+                # PRAW gives the bare display name (no 'r/', no whitespace) -> lower() is enough;
+                # interned: a user posts to few subs, so the cache/set keys share one str object per sub
+                sub_key = sys.intern(str(d.get("subreddit", "")).lower())
 
                 # visited subs -> skip
-                if sub_key in visited_subs:
-                    if sub_key not in logged_visited_subs:
+                allowed = sub_allowed.get(sub_key)
+                if allowed is None:
+                    allowed = sub_allowed[sub_key] = sub_key not in visited_subs
+                    if not allowed:
                         log(f"[skip] r/{sub_key} in visited_subs.txt, skipped (comments)")
-                        logged_visited_subs.add(sub_key)
-                    pbar.update(1)
-                    time.sleep(sleep_s)
+                if not allowed:
+                    pbar.tick()
                     continue
 
-                # HU filter
+                text = ""
                 if hu_threshold is not None:
-                    body = getattr(c, "body", "") or ""
+                    body = d.get("body", "") or ""
                     text = body.strip()
+                yield d, sub_key, text
+
+        for d, sub_key, (keep, ld_score, hs_score) in hu_decisions(
+                comment_candidates(), hu_threshold, detect_langs_func, hunspell_obj, hu_pool, hu_cache):
+            # HU filter
+            if not keep:
+                if logged_skips < 5:
+                    log(f"[skip] r/{sub_key} not HU enough (comments) ld={ld_score:.3f} hs={hs_score:.3f}")
+                    logged_skips += 1
+                pbar.tick()
+                continue
 
-                    keep, ld_score, hs_score = is_hungarian(text, hu_threshold, detect_langs_func, hunspell_obj)
-                    if not keep:
-                        if logged_filter_skips < 5:
-                            log(f"[skip] r/{sub_key} not HU enough (comments) ld={ld_score:.3f} hs={hs_score:.3f}")
-                            logged_filter_skips += 1
-                        pbar.update(1)
-                        time.sleep(sleep_s)
-                        continue
-
-                # FIX: ugyanaz a szabály kommenteknél is
-                if sub_key and (sub_key not in new_subs_seen):
+            # FIX: ugyanaz a szabály kommenteknél is
+            if sub_key not in subs_recorded:
+                subs_recorded.add(sub_key)
+                if new_subs_log is not None and new_subs_log.add(sub_key):
                     log(f"[new]  r/{sub_key}")
-                    append_new_sub(sub_key, new_subs_seen)
 
-                write_comment_block(cmts_file, c)
-                cmts_saved += 1
-                pbar.update(1)
-                time.sleep(sleep_s)
+            write_comment_block(cmts_file or _cmts_out(), d)
+            cmts_saved += 1
+            pbar.tick()
+
+        pbar.close()
+        log(f"[dl]   Finished u/{uname_key} comments. Saved: {cmts_saved} -> {chats_path if cmts_saved else 'no file'}")
+        return cmts_saved
 
-            pbar.close()
-            log(f"[dl]   Finished u/{uname_key} comments. Saved: {cmts_saved} -> {chats_path}")
+    try:
+        if include_posts:
+            drain_posts()
+        if include_comments:
+            drain_comments()
 
     finally:
-        if posts_file:
-            posts_file.flush()
-            posts_file.close()
-        if cmts_file:
-            cmts_file.flush()
+        # nothing kept this run -> no file; a previous run's file at that path would look current, drop it
+        if posts_file is not None:
+            posts_file.close()  # flushes the rest
+        elif include_posts:
+            posts_path.unlink(missing_ok=True)
+        if cmts_file is not None:
             cmts_file.close()
+        elif include_comments:
+            chats_path.unlink(missing_ok=True)
 
+    if visited_log is not None:
+        visited_log.add(uname_key)
     log(f"[done] Completed u/{uname_key}")
 
 
@@ -616,7 +1211,7 @@ def main():
         "--sleep",
         type=float,
         default=0.5,
-        help="sleep between items (seconds)")
+        help="minimum gap between listing requests of 100 items (seconds)")
 
     ap.add_argument(
         "--auth-test",
@@ -640,25 +1235,50 @@ def main():
         help="Hungarian filter threshold (0..1). Keep item if langdetect OR phunspell >= threshold. Example: --filterhu 0.4",
     )
 
+    ap.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help=f"number of users processed in parallel; their Reddit requests are serialized, so this only "
+             f"overlaps HU scoring / file writes with the HTTP of another user (default: {DEFAULT_WORKERS})")
+
+    ap.add_argument(
+        "--pushshift",
+        action="store_true",
+        help="with --after/--before: look up the item ids in the time window via Pushshift first "
+             "(falls back to the PRAW listing if Pushshift is unreachable)")
+
     args = ap.parse_args()
+    if args.workers < 1:
+        raise RuntimeError("--workers must be at least 1")
     after = to_epoch(args.after)
     before = to_epoch(args.before)
+    if after is not None and before is not None and after > before:
+        # empty window: every listing would be paged through without keeping anything
+        raise RuntimeError("--after must not be later than --before")
 
     reddit = init_reddit()
     if args.auth_test:
         log("[auth] smoke test successful – exiting (--auth-test)")
         return
+    serialize_http(reddit)
+
+    # Load visited users / timeouts once (used for in-memory membership checks)
+    visited_log = AppendLog(VISITED_FILE, compact_above=VISITED_COMPACT_MIN)
+    timeouts_log = AppendLog(TIMEOUTS_FILE)
+    log(f"[info] Loaded {len(visited_log)} visited user(s) from {VISITED_FILE}")
 
     # Load visited subs + new_subs cache
-    visited_subs = load_visited_subs()
-    new_subs_seen = load_existing_new_subs()
+    visited_subs = frozenset(load_visited_subs())  # read-only for the whole run, checked for every item
+    new_subs_log = AppendLog(NEW_SUBS_FILE, loader=_load_sub_set)
     log(f"[info] Loaded {len(visited_subs)} visited sub(s) from {VISITED_SUBS_FILE}")
-    log(f"[info] Loaded {len(new_subs_seen)} already-known new sub(s) from {NEW_SUBS_FILE}")
+    log(f"[info] Loaded {len(new_subs_log)} already-known new sub(s) from {NEW_SUBS_FILE}")
 
     # HU filter init (only if requested)
     hu_threshold: Optional[float] = args.filterhu
     detect_langs_func = None
     hunspell_obj = None
+    hs_ok = False
 
     if hu_threshold is not None:
         if hu_threshold < 0.0 or hu_threshold > 1.0:
@@ -688,7 +1308,8 @@ def main():
     else:
         users = args.username if args.username else DEFAULT_USERS
 
-    outdir = args.out if args.out else DEFAULT_OUTDIR
+    outdir = pathlib.Path(args.out if args.out else DEFAULT_OUTDIR)
+    ensure_dir(str(outdir))
 
     # reset visited for this run
     if args.reset_visited and VISITED_FILE.exists():
@@ -697,42 +1318,80 @@ def main():
     else:
         visited_override = False
 
+    # dedupe centrally (CLI names are not deduped yet, 'Alice' == 'u/alice'), order kept:
+    # the same user twice would mean redundant downloads + two threads writing the same output files
+    users = [u for u in dict.fromkeys(_norm_user(u) for u in users) if u]
+
+    # visited users are filtered out before anything is submitted to the pool
+    # (one membership pass over the run's starting snapshot, users are already normalized keys)
+    if not visited_override:
+        n_all = len(users)
+        users = [u for u in users if u not in visited_log]
+        if len(users) < n_all:
+            log(f"[skip] Already processed: {n_all - len(users)} user(s)")
+
     total = len(users)
-    for i, u in enumerate(users, start=1):
-        if not u.strip():
-            continue
+    rate_limiter = RateLimiter(args.sleep, reddit=reddit)
+    stop = threading.Event()  # set on Ctrl+C: running users bail out at their next item
 
-        uname_key = _norm_user(u)
+    def process_one(i: int, uname_key: str) -> None:
         log(f"\n=== [{i}/{total}] Queue: u/{uname_key} ===")
 
-        if (not visited_override) and is_visited(u):
-            log(f"[skip] Already processed u/{uname_key}")
-            continue
-
         try:
             download_user_activity(
                 reddit=reddit,
-                username=u,
+                uname_key=uname_key,
                 out_dir=outdir,
                 after=after,
                 before=before,
                 limit_posts=args.limit_posts,
                 limit_comments=args.limit_comments,
-                sleep_s=args.sleep,
+                rate_limiter=rate_limiter,
                 include_posts=(not args.no_posts),
                 include_comments=(not args.no_comments),
                 visited_subs=visited_subs,
-                new_subs_seen=new_subs_seen,  # ugyanazt a set-et visszük végig futás közben
+                new_subs_log=new_subs_log,  # ugyanazt a logot visszük végig futás közben
                 hu_threshold=hu_threshold,
                 detect_langs_func=detect_langs_func,
-                hunspell_obj=huntspell_obj if False else hunspell_obj,  # no-op: keep variable name unchanged
+                hunspell_obj=hunspell_obj,
+                hu_pool=hu_pool,
+                hu_cache=hu_cache,
+                use_pushshift=args.pushshift,
+                visited_log=visited_log,
+                stop=stop,
             )
-            add_to_visited(u)
 
         except Exception as e:
             log(f"[ABORT USER] u/{uname_key} due to failure: {e!r}")
-            add_to_timeouts(u)
-            continue
+            timeouts_log.add(uname_key)
+
+    hu_pool = init_hu_pool(hu_threshold) if hu_threshold is not None else None
+    if hu_pool is not None:
+        # the workers score everything: the parent's detectors were only needed for the check above
+        detect_langs_func = hunspell_obj = None
+    hu_cache = HuCache(HU_CACHE_FILE, hunspell_ok=hs_ok) if hu_threshold is not None else None
+    try:
+        # the shared praw.Reddit is not thread-safe: serialize_http() lets only one request be in flight,
+        # paced by prawcore. Extra workers only overlap HU scoring + file writes of one user with the
+        # HTTP of another, they do not make more requests at once (hence the small default).
+        with ThreadPoolExecutor(max_workers=args.workers) as ex:
+            futures = [ex.submit(process_one, i, u) for i, u in enumerate(users, start=1)]
+            try:
+                for fut in tqdm(as_completed(futures), total=len(futures), desc="Users", unit="user"):
+                    fut.result()
+            except BaseException:
+                # Ctrl+C (or a fatal error): the queued users are dropped, the running ones stop at
+                # their next item and end up in timeouts_users.txt (not visited -> next run redoes them)
+                log("[stop] Stopping: cancelling queued users, waiting for the running ones to bail out ...")
+                stop.set()
+                ex.shutdown(wait=False, cancel_futures=True)
+                raise
+    finally:
+        if hu_pool is not None:
+            hu_pool.close()
+            hu_pool.join()
+        if hu_cache is not None:
+            hu_cache.close()
 
 
 if __name__ == "__main__":